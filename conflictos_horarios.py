@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Detector de conflictos de horarios
+Sistema de Gestión Integral de Cursos
+Busca aulas y profesores con dos clases a la vez, leyendo los horarios de una
+plantilla de backup rellena o de db/custom.db, y escribe una hoja de conflictos.
+
+Las clases recurrentes valen durante las fechas de su curso (startDate..endDate)
+y las no recurrentes solo el día de su startTime, así que los horarios de cursos
+de años distintos no chocan aunque compartan aula y hora.
+
+Los horarios se agrupan por (día de la semana, aula) y (día de la semana,
+profesor); cada grupo se recorre una vez por fecha de inicio manteniendo un
+montículo por fecha de fin, de modo que solo se comparan las horas de las clases
+vigentes a la vez. Como en un aula y un día solo caben unas pocas clases sin
+pisarse, el coste es O(n log n) más el número de pares que se pisan, aunque se
+acumulen horarios de muchos cursos académicos.
+
+El profesor de una clase es el teacherId del horario (si la BD tiene esa columna)
+o, si no, el del curso.
+
+Uso:
+    python conflictos_horarios.py                        # desde db/custom.db
+    python conflictos_horarios.py --plantilla BACKUP_DATOS.xlsx
+    python conflictos_horarios.py --salida CONFLICTOS_HORARIOS.xlsx
+"""
+
+import argparse
+import heapq
+from collections import defaultdict, namedtuple
+from datetime import date
+
+from openpyxl import Workbook
+
+from generar_plantilla_backup import header_cells
+from exportar_backup_excel import tipos_columnas
+from lector_plantilla import LectorBD, LectorPlantilla
+
+DIAS = ["MONDAY", "TUESDAY", "WEDNESDAY", "THURSDAY", "FRIDAY", "SATURDAY", "SUNDAY"]
+
+COLUMNAS_CONFLICTOS = [
+    "Tipo", "Recurso", "dayOfWeek", "Solape",
+    "scheduleId A", "courseId A", "Horario A",
+    "scheduleId B", "courseId B", "Horario B",
+]
+ANCHOS_CONFLICTOS = {"A": 12, "B": 30, "C": 12, "D": 14, "E": 16, "F": 16, "G": 14, "H": 16, "I": 16, "J": 14}
+
+# Una clase ya resuelta: horas en minutos desde medianoche y periodo de validez
+# (fechas; None = sin límite)
+Franja = namedtuple("Franja", "id courseId dia inicio fin aula teacherId desde hasta")
+
+
+def minutos(momento):
+    return momento.hour * 60 + momento.minute
+
+
+def hora(minutos_dia):
+    return f"{minutos_dia // 60:02d}:{minutos_dia % 60:02d}"
+
+
+def construir_franjas(horarios, cursos, profesores_horario=None):
+    """
+    Pasa los registros Schedule a Franjas. `cursos` es id -> registro Course y
+    `profesores_horario` id de horario -> teacherId. Devuelve (franjas, descartados).
+    """
+    profesores_horario = profesores_horario or {}
+    franjas = []
+    descartados = []
+    for h in horarios:
+        if not h.startTime or not h.endTime or not h.dayOfWeek:
+            descartados.append(h.id)
+            continue
+        inicio, fin = minutos(h.startTime), minutos(h.endTime)
+        if fin <= inicio:
+            descartados.append(h.id)
+            continue
+        curso = cursos.get(h.courseId)
+        if h.isRecurring is False:
+            desde = hasta = h.startTime.date()
+        else:
+            desde = curso.startDate if curso else None
+            hasta = curso.endDate if curso else None
+        franjas.append(Franja(
+            h.id, h.courseId, h.dayOfWeek.strip().upper(), inicio, fin,
+            h.classroom.strip() if h.classroom else None,
+            profesores_horario.get(h.id) or (curso.teacherId if curso else None),
+            desde, hasta,
+        ))
+    return franjas, descartados
+
+
+def solapes(franjas):
+    """
+    Pares de franjas (del mismo recurso y día) que se pisan en fechas y en hora.
+    Una clase que empieza justo cuando termina otra no es conflicto.
+    """
+    vigentes = {}   # orden -> franja cuyo periodo incluye la fecha del barrido
+    fines = []      # montículo (hasta, orden) para retirar las que ya terminaron
+    por_fecha = sorted(enumerate(franjas), key=lambda p: (p[1].desde or date.min, p[1].inicio))
+    for n, franja in por_fecha:
+        desde = franja.desde or date.min
+        while fines and fines[0][0] < desde:
+            del vigentes[heapq.heappop(fines)[1]]
+        for otra in vigentes.values():
+            if otra.inicio < franja.fin and franja.inicio < otra.fin:
+                yield (otra, franja) if (otra.inicio, otra.fin) <= (franja.inicio, franja.fin) else (franja, otra)
+        vigentes[n] = franja
+        heapq.heappush(fines, (franja.hasta or date.max, n))
+
+
+def indices(franjas):
+    """Índices (tipo, día, recurso) -> franjas, por aula y por profesor"""
+    grupos = defaultdict(list)
+    for franja in franjas:
+        if franja.aula:
+            grupos[("Aula", franja.dia, franja.aula.casefold())].append(franja)
+        if franja.teacherId:
+            grupos[("Profesor", franja.dia, franja.teacherId)].append(franja)
+    return grupos
+
+
+def detectar_conflictos(franjas, profesores=None):
+    """Filas de la hoja de conflictos, ordenadas por día, tipo, recurso y hora"""
+    profesores = profesores or {}
+    conflictos = []
+    for (tipo, dia, _), grupo in indices(franjas).items():
+        if len(grupo) < 2:
+            continue
+        for a, b in solapes(grupo):
+            if tipo == "Aula":
+                recurso = a.aula
+            else:
+                recurso = f"{profesores[a.teacherId]} ({a.teacherId})" if a.teacherId in profesores else a.teacherId
+            conflictos.append((
+                DIAS.index(dia) if dia in DIAS else len(DIAS), tipo, recurso, max(a.inicio, b.inicio),
+                [tipo, recurso, dia, f"{hora(max(a.inicio, b.inicio))}-{hora(min(a.fin, b.fin))}",
+                 a.id, a.courseId, f"{hora(a.inicio)}-{hora(a.fin)}",
+                 b.id, b.courseId, f"{hora(b.inicio)}-{hora(b.fin)}"],
+            ))
+    conflictos.sort(key=lambda c: c[:4])
+    return [fila for *_, fila in conflictos]
+
+
+def cargar(plantilla=None, db_path="db/custom.db"):
+    """Devuelve (franjas, descartados, profesores id -> nombre) desde la plantilla o la BD"""
+    if plantilla:
+        with LectorPlantilla(plantilla) as lector:
+            cursos = {c.id: c for c in lector.registros("Course")}
+            profesores = {p.id: p.name for p in lector.registros("Teacher")}
+            franjas, descartados = construir_franjas(lector.registros("Schedule"), cursos)
+    else:
+        with LectorBD(db_path) as lector:
+            cursos = {c.id: c for c in lector.registros("Course")}
+            profesores = {p.id: p.name for p in lector.registros("Teacher")}
+            # El modelo Prisma tiene teacherId en Schedule; las BD antiguas no
+            profesores_horario = {}
+            if "teacherId" in tipos_columnas(lector.conn, "schedules"):
+                profesores_horario = dict(lector.conn.execute(
+                    'SELECT "id", "teacherId" FROM "schedules" WHERE "teacherId" IS NOT NULL'))
+            franjas, descartados = construir_franjas(lector.registros("Schedule"), cursos, profesores_horario)
+    return franjas, descartados, profesores
+
+
+def create_conflicts_excel(conflictos, filename="CONFLICTOS_HORARIOS.xlsx"):
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("⚠️ Conflictos")
+    for column_letter, width in ANCHOS_CONFLICTOS.items():
+        ws.column_dimensions[column_letter].width = width
+    ws.append(header_cells(ws, COLUMNAS_CONFLICTOS))
+    for fila in conflictos:
+        ws.append(fila)
+    wb.save(filename)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Detecta aulas y profesores con horarios solapados")
+    parser.add_argument("--plantilla", help="Plantilla de backup rellena (si no, se lee la BD)")
+    parser.add_argument("--db", default="db/custom.db")
+    parser.add_argument("--salida", default="CONFLICTOS_HORARIOS.xlsx")
+    args = parser.parse_args()
+
+    franjas, descartados, profesores = cargar(args.plantilla, args.db)
+    conflictos = detectar_conflictos(franjas, profesores)
+    create_conflicts_excel(conflictos, args.salida)
+
+    print(f"✅ Hoja de conflictos creada: {args.salida}")
+    print(f"   {len(franjas)} horarios analizados, {len(conflictos)} conflictos")
+    if descartados:
+        print(f"⚠️  {len(descartados)} horarios sin hora válida (fin anterior al inicio o vacío): {', '.join(map(str, descartados[:10]))}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Detector de duplicados y casi-duplicados
+Sistema de Gestión Integral de Cursos
+Revisa Students, Teachers, Providers y Contacts (cada modelo por separado) desde
+una plantilla de backup rellena o desde db/custom.db y escribe una hoja con los
+candidatos a fusionar:
+
+    • Claves exactas: email, dni, taxId y affiliateNumber normalizados se agrupan
+      por hash; cada grupo con más de un registro es un duplicado seguro.
+    • Casi-duplicados: los registros se reparten en bloques que comparten una
+      pista (mismo teléfono, mismo usuario de email, mismo nombre y fecha de
+      nacimiento) y solo se comparan los nombres dentro de cada bloque, sin
+      tildes, sin mayúsculas y sin importar el orden de las palabras
+      ("Juan Pérez García" = "García Pérez, Juan").
+
+Nunca se comparan todos contra todos: los bloques demasiado grandes (p. ej. un
+teléfono de relleno repetido miles de veces) se recorren ordenados por nombre
+comparando cada registro solo con sus vecinos. Los pares encontrados se agrupan
+(unión de conjuntos) para proponer una fusión por grupo.
+
+Uso:
+    python duplicados.py                         # desde db/custom.db
+    python duplicados.py --plantilla BACKUP_DATOS.xlsx
+    python duplicados.py --umbral 0.9 --salida DUPLICADOS.xlsx
+"""
+
+import argparse
+import re
+import unicodedata
+from collections import defaultdict, namedtuple
+from difflib import SequenceMatcher
+from itertools import combinations
+
+from openpyxl import Workbook
+
+from generar_plantilla_backup import header_cells
+from lector_plantilla import LectorBD, LectorPlantilla
+
+MODELOS_PERSONAS = ["Student", "Teacher", "Provider", "Contact"]
+
+# Similitud mínima de nombres (0-1) para proponer un casi-duplicado
+UMBRAL_SIMILITUD = 0.85
+
+# Bloques de más registros que esto se comparan por vecindad ordenada
+MAX_BLOQUE = 50
+VENTANA_VECINOS = 10
+
+COLUMNAS_CANDIDATOS = [
+    "Grupo", "Modelo", "Motivo", "Similitud",
+    "id A", "name A", "email A", "phone A",
+    "id B", "name B", "email B", "phone B",
+]
+ANCHOS_CANDIDATOS = {"A": 8, "B": 10, "C": 36, "D": 10, "E": 16, "F": 28, "G": 28, "H": 16,
+                     "I": 16, "J": 28, "K": 28, "L": 16}
+
+Persona = namedtuple("Persona", "id nombre email telefono clave_nombre")
+
+
+def sin_acentos(texto):
+    if texto.isascii():
+        return texto
+    return "".join(c for c in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(c))
+
+
+def normalizar_nombre(nombre):
+    """Palabras sin tildes ni mayúsculas, ordenadas: "Pérez García, Juan" -> "garcia juan perez" """
+    return " ".join(sorted(re.findall(r"[a-z0-9]+", sin_acentos(nombre or "").casefold())))
+
+
+def normalizar_email(email):
+    return email.strip().casefold() or None
+
+
+def usuario_email(email):
+    # "Juan.Perez+cursos@gmail.com" y "juanperez@hotmail.com" comparten usuario
+    usuario = email.strip().casefold().split("@")[0].split("+")[0]
+    usuario = re.sub(r"[._-]", "", usuario)
+    return usuario if len(usuario) >= 4 else None
+
+
+def normalizar_documento(valor):
+    return re.sub(r"[^0-9A-Z]", "", sin_acentos(valor).upper()) or None
+
+
+def normalizar_telefono(telefono):
+    digitos = re.sub(r"\D", "", telefono)
+    # Sin prefijo internacional (0034 / +34): se comparan los 9 últimos dígitos
+    return digitos[-9:] if len(digitos) >= 7 else None
+
+
+# Campos que deben ser únicos y cómo se normalizan antes de hacer el hash
+CLAVES_EXACTAS = {
+    "email": normalizar_email,
+    "dni": normalizar_documento,
+    "taxId": normalizar_documento,
+    "affiliateNumber": normalizar_documento,
+}
+
+
+# Motivo que se muestra para cada tipo de bloque
+MOTIVOS_BLOQUE = {
+    "telefono": "teléfono igual y nombre similar",
+    "usuario": "usuario de email igual y nombre similar",
+    "nacimiento": "mismo nombre y fecha de nacimiento",
+}
+
+
+def bloques_registro(registro, clave_nombre):
+    """Bloques de un registro para la búsqueda de casi-duplicados (el primer elemento es el tipo)"""
+    campos = registro._fields
+    for campo in ("phone", "mobile"):
+        valor = getattr(registro, campo) if campo in campos else None
+        if valor and (telefono := normalizar_telefono(str(valor))):
+            yield ("telefono", telefono)
+    if registro.email and (usuario := usuario_email(str(registro.email))):
+        yield ("usuario", usuario)
+    if "birthDate" in campos and registro.birthDate and clave_nombre:
+        yield ("nacimiento", clave_nombre, registro.birthDate)
+
+
+def pares_bloque(indices, personas):
+    """Pares a comparar dentro de un bloque: todos si es pequeño, vecinos por nombre si no"""
+    if len(indices) <= MAX_BLOQUE:
+        yield from combinations(indices, 2)
+        return
+    orden = sorted(indices, key=lambda i: personas[i].clave_nombre)
+    for n, i in enumerate(orden):
+        for j in orden[n + 1:n + 1 + VENTANA_VECINOS]:
+            yield i, j
+
+
+def similitud(a, b, umbral=0.0):
+    """Parecido de dos nombres normalizados; 0 si no llega al umbral (con atajos baratos)"""
+    if a == b:
+        return 1.0
+    comparador = SequenceMatcher(None, a, b, autojunk=False)
+    if comparador.real_quick_ratio() < umbral or comparador.quick_ratio() < umbral:
+        return 0.0
+    ratio = comparador.ratio()
+    return ratio if ratio >= umbral else 0.0
+
+
+def buscar_candidatos(registros, umbral=UMBRAL_SIMILITUD):
+    """
+    Devuelve (personas, {(i, j): [motivos, similitud]}) con i < j, índices en `personas`.
+    """
+    personas = []
+    exactos = defaultdict(list)
+    bloques = defaultdict(list)
+    for registro in registros:
+        i = len(personas)
+        campos = registro._fields
+        telefono = getattr(registro, "phone", None) or getattr(registro, "mobile", None)
+        persona = Persona(registro.id, registro.name, registro.email, telefono, normalizar_nombre(registro.name))
+        personas.append(persona)
+        for campo, normalizar in CLAVES_EXACTAS.items():
+            valor = getattr(registro, campo) if campo in campos else None
+            if valor and (clave := normalizar(str(valor))):
+                exactos[(campo, clave)].append(i)
+        # phone y mobile pueden dar el mismo bloque: cada registro entra una sola vez
+        for bloque in dict.fromkeys(bloques_registro(registro, persona.clave_nombre)):
+            bloques[bloque].append(i)
+
+    pares = {}
+
+    def anotar(i, j, motivo, valor):
+        if i == j:
+            return
+        par = pares.setdefault((min(i, j), max(i, j)), [[], valor])
+        if motivo not in par[0]:
+            par[0].append(motivo)
+        par[1] = max(par[1], valor)
+
+    # Claves exactas: basta con enlazar cada registro del grupo con el primero
+    for (campo, _), indices in exactos.items():
+        for j in indices[1:]:
+            i = indices[0]
+            anotar(i, j, f"{campo} repetido", similitud(personas[i].clave_nombre, personas[j].clave_nombre))
+
+    for bloque, indices in bloques.items():
+        if len(indices) < 2:
+            continue
+        for i, j in pares_bloque(indices, personas):
+            valor = similitud(personas[i].clave_nombre, personas[j].clave_nombre, umbral)
+            if valor:
+                anotar(i, j, MOTIVOS_BLOQUE[bloque[0]], valor)
+    return personas, pares
+
+
+def agrupar(pares):
+    """Unión de conjuntos: índice de persona -> representante de su grupo"""
+    padre = {}
+
+    def raiz(x):
+        padre.setdefault(x, x)
+        while padre[x] != x:
+            padre[x] = padre[padre[x]]
+            x = padre[x]
+        return x
+
+    for i, j in pares:
+        ri, rj = raiz(i), raiz(j)
+        if ri != rj:
+            padre[max(ri, rj)] = min(ri, rj)
+    return {x: raiz(x) for x in padre}
+
+
+def filas_candidatos(modelo, personas, pares, primer_grupo=1):
+    """Filas de la hoja para un modelo, ordenadas por grupo. Devuelve (filas, siguiente grupo)"""
+    grupos = agrupar(pares)
+    numeros = {}
+    filas = []
+    for (i, j), (motivos, valor) in sorted(pares.items(), key=lambda p: (grupos[p[0][0]], p[0])):
+        numero = numeros.setdefault(grupos[i], primer_grupo + len(numeros))
+        a, b = personas[i], personas[j]
+        filas.append([numero, modelo, ", ".join(motivos), round(valor, 2),
+                      a.id, a.nombre, a.email, a.telefono,
+                      b.id, b.nombre, b.email, b.telefono])
+    return filas, primer_grupo + len(numeros)
+
+
+def create_duplicates_excel(filas, filename="DUPLICADOS.xlsx"):
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("🔁 Candidatos fusión")
+    for column_letter, width in ANCHOS_CANDIDATOS.items():
+        ws.column_dimensions[column_letter].width = width
+    ws.append(header_cells(ws, COLUMNAS_CANDIDATOS))
+    for fila in filas:
+        ws.append(fila)
+    wb.save(filename)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Busca registros duplicados o casi duplicados")
+    parser.add_argument("--plantilla", help="Plantilla de backup rellena (si no, se lee la BD)")
+    parser.add_argument("--db", default="db/custom.db")
+    parser.add_argument("--salida", default="DUPLICADOS.xlsx")
+    parser.add_argument("--umbral", type=float, default=UMBRAL_SIMILITUD,
+                        help="Similitud mínima de nombres (0-1) para los casi-duplicados")
+    args = parser.parse_args()
+
+    lector = LectorPlantilla(args.plantilla) if args.plantilla else LectorBD(args.db)
+    filas = []
+    grupo = 1
+    with lector:
+        for modelo in MODELOS_PERSONAS:
+            personas, pares = buscar_candidatos(lector.registros(modelo), args.umbral)
+            filas_modelo, siguiente = filas_candidatos(modelo, personas, pares, grupo)
+            print(f"   {modelo}: {len(personas)} registros, {siguiente - grupo} grupos de posibles duplicados")
+            filas.extend(filas_modelo)
+            grupo = siguiente
+
+    create_duplicates_excel(filas, args.salida)
+    print(f"✅ Hoja de candidatos a fusionar creada: {args.salida}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Exportador de la base de datos a un Excel de backup con datos
+Sistema de Gestión Integral de Cursos
+Rellena la misma estructura que PLANTILLA_BACKUP_DATOS.xlsx (cabecera en la fila 1,
+ejemplo en la fila 2 y datos desde la fila 3) con el contenido de db/custom.db
+
+Las tablas que superan el límite de filas por hoja continúan en hojas
+"💰 Payments (2)", "(3)"... con la misma cabecera y validaciones. Opcionalmente
+se pueden repartir por una clave: "payments=paymentDate:anio" crea
+"💰 Payments 2024", "💰 Payments 2025"... y "payments=courseId" una por curso.
+El importador de la aplicación (src/app/import/page.tsx) junta todas las hojas de
+una tabla con el mismo patrón que patron_fragmentos().
+
+El libro se escribe en modo write_only (las filas van directas al fichero) y las
+filas de cada tabla esperan en un buffer con presupuesto de memoria que se vuelca
+a disco si se supera; al terminar se muestra el pico de memoria.
+
+Uso:
+    python exportar_backup_excel.py [--filas-por-hoja N] [--fragmentar payments=paymentDate:anio] [--memoria-mb 256]
+"""
+
+import argparse
+import re
+import sqlite3
+from datetime import datetime, timezone
+
+from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
+
+from generar_plantilla_backup import (
+    HOJAS_BACKUP,
+    HOY,
+    add_validations,
+    create_data_sheet,
+    create_instructions_sheet,
+)
+from presupuesto_memoria import MAX_MEMORIA_MB, BufferFilas, PresupuestoMemoria
+from resaltados_excel import apply_highlights
+
+# Columnas DateTime que se exportan con hora (el resto solo con fecha)
+COLUMNAS_CON_HORA = {"startTime", "endTime"}
+
+# Máximo de filas de datos por hoja: 1.048.576 filas de Excel menos cabecera y ejemplo
+MAX_FILAS_HOJA = 1_048_576 - 2
+
+# Excel limita los nombres de hoja a 31 caracteres y prohíbe []:*?/\ ; los
+# paréntesis se reservan para el número de fragmento
+MAX_TITULO_HOJA = 31
+_CARACTERES_PROHIBIDOS = re.compile(r"[\[\]:*?/\\()]")
+
+# Hojas por tabla (o por clave) como máximo: el título siempre deja sitio para " (9999)"
+MAX_FRAGMENTOS = 9999
+
+
+def campos_hoja(hoja):
+    """Nombres de campo de la BD para una hoja (sin '*' y sin la columna NOTAS)"""
+    return [col.rstrip("*") for col in hoja["columnas"] if col != "NOTAS"]
+
+
+def es_fila_ejemplo(valores, hoja):
+    """
+    Indica si `valores` (en el orden de campos_hoja) es la fila de ejemplo de la
+    plantilla. Se reconoce por el contenido y no por la posición, porque las
+    instrucciones permiten borrarla; la fecha de hoy no cuenta.
+    """
+    ejemplo = [v for v, col in zip(hoja["ejemplo"], hoja["columnas"]) if col != "NOTAS"]
+    for valor, esperado in zip(valores, ejemplo):
+        if esperado == HOY:
+            continue
+        if ("" if valor is None else str(valor).strip()) != esperado.strip():
+            return False
+    return True
+
+
+def tipos_columnas(conn, tabla):
+    """Tipo declarado de cada columna de la tabla (TEXT, REAL, BOOLEAN, DATETIME...)"""
+    return {fila[1]: fila[2].upper() for fila in conn.execute(f'PRAGMA table_info("{tabla}")')}
+
+
+def formatear_fecha(valor, con_hora=False):
+    # Prisma guarda los DateTime en SQLite como milisegundos desde epoch
+    if isinstance(valor, (int, float)):
+        fecha = datetime.fromtimestamp(valor / 1000, tz=timezone.utc)
+    else:
+        try:
+            fecha = datetime.fromisoformat(str(valor).replace("Z", "+00:00"))
+        except ValueError:
+            return str(valor)
+    return fecha.strftime("%Y-%m-%d %H:%M:%S" if con_hora else "%Y-%m-%d")
+
+
+def convertidores_hoja(conn, hoja):
+    """Lista de funciones (una por campo) que pasan el valor de la BD al formato del Excel"""
+    tipos = tipos_columnas(conn, hoja["tabla"])
+    convertidores = []
+    for campo in campos_hoja(hoja):
+        tipo = tipos.get(campo, "TEXT")
+        if tipo == "BOOLEAN":
+            convertidores.append(lambda v: None if v is None else ("SI" if v else "NO"))
+        elif tipo == "DATETIME":
+            con_hora = campo in COLUMNAS_CON_HORA
+            convertidores.append(lambda v, h=con_hora: None if v is None else formatear_fecha(v, h))
+        else:
+            convertidores.append(None)
+    return convertidores
+
+
+def leer_filas(conn, hoja, desde=None, orden=None, no_vistos=None):
+    """
+    Genera las filas de la tabla ya convertidas al formato del Excel.
+    Con `desde` solo devuelve las modificadas a partir de ese updatedAt y con
+    `no_vistos` (una tabla con columna id) solo las de ids que no estén en ella.
+    Cada elemento es (fila, updatedAt en bruto).
+    """
+    campos = campos_hoja(hoja)
+    convertidores = convertidores_hoja(conn, hoja)
+    columnas_sql = ", ".join(f'"{c}"' for c in campos)
+    sql = f'SELECT {columnas_sql}, "updatedAt" FROM "{hoja["tabla"]}"'
+    params = ()
+    if desde is not None:
+        sql += ' WHERE "updatedAt" >= ? ORDER BY "updatedAt"'
+        params = (desde,)
+    elif no_vistos:
+        sql += f' WHERE "id" NOT IN (SELECT "id" FROM {no_vistos})'
+    elif orden:
+        sql += f' ORDER BY "{orden}"'
+
+    for registro in conn.execute(sql, params):
+        fila = [conv(v) if conv else v for conv, v in zip(convertidores, registro)]
+        yield fila, registro[-1]
+
+
+def avanzar_marca(marca, actualizado, id_):
+    """
+    Actualiza la marca de sincronización [updatedAt máximo, ids con ese updatedAt].
+    Guardar los ids permite pedir luego `updatedAt >= marca` sin repetir filas.
+    """
+    if actualizado is None:
+        return
+    if marca[0] is None or actualizado > marca[0]:
+        marca[0] = actualizado
+        marca[1] = [id_]
+    elif actualizado == marca[0]:
+        marca[1].append(id_)
+
+
+def longitud_excel(texto):
+    # Excel cuenta los caracteres en UTF-16 (un emoji puede ocupar 2 o más)
+    return len(texto.encode("utf-16-le")) // 2
+
+
+def limpiar_clave(valor):
+    clave = _CARACTERES_PROHIBIDOS.sub("", str(valor)).strip() if valor not in (None, "") else ""
+    return clave or "sin dato"
+
+
+def recortar_excel(texto, maximo):
+    """Recorta `texto` a `maximo` caracteres de Excel (UTF-16) sin espacios al final"""
+    while longitud_excel(texto) > maximo:
+        texto = texto[:-1]
+    return texto.rstrip()
+
+
+def espacio_clave(base):
+    """Caracteres que le quedan a la clave en el título, reservando el sufijo más largo"""
+    return max(MAX_TITULO_HOJA - longitud_excel(base) - 1 - longitud_excel(f" ({MAX_FRAGMENTOS})"), 1)
+
+
+def titulo_fragmento(base, clave=None, numero=1):
+    """
+    Nombre de hoja de un fragmento: "💰 Payments", "💰 Payments 2024 (2)"...
+    La clave se recorta siempre al mismo largo, así que todas las hojas de una
+    misma clave llevan el mismo texto sea cual sea su número.
+    """
+    sufijo = f" ({numero})" if numero > 1 else ""
+    if clave:
+        base = f"{base} {recortar_excel(clave, espacio_clave(base))}"
+    return base + sufijo
+
+
+def patron_fragmentos(base):
+    return re.compile(rf"^{re.escape(base)}(?: (?P<clave>[^()]+?))?(?: \((?P<numero>\d+)\))?$")
+
+
+def fragmentos_hoja(titulos, hoja):
+    """Títulos de todas las hojas que pertenecen a la tabla, en el orden del libro"""
+    patron = patron_fragmentos(hoja["titulo"])
+    return [titulo for titulo in titulos if patron.match(titulo)]
+
+
+def parsear_fragmentacion(especificaciones):
+    """["payments=paymentDate:anio", ...] -> {"payments": "paymentDate:anio", ...}"""
+    resultado = {}
+    for especificacion in especificaciones or []:
+        tabla, _, campo = especificacion.partition("=")
+        resultado[tabla.strip()] = campo.strip()
+    return resultado
+
+
+# Modos de "campo:modo" que fragmentan por el año de una fecha ("año" se acepta
+# por compatibilidad con estados de journal anteriores)
+MODOS_ANIO = {"anio", "year", "año"}
+
+
+def funcion_clave(hoja, especificacion):
+    """
+    Devuelve (función fila -> clave, campo por el que ordenar) para una
+    especificación "campo" o "campo:anio", o (None, None) si no se fragmenta por clave.
+    """
+    if not especificacion:
+        return None, None
+    campo, _, modo = especificacion.partition(":")
+    indice = campos_hoja(hoja).index(campo)
+    modo = modo.strip().lower()
+    if modo in MODOS_ANIO:
+        return (lambda fila: str(fila[indice])[:4] if fila[indice] else None), campo
+    if modo:
+        raise ValueError(f"Modo de fragmentación desconocido: {modo!r} (usa :anio)")
+    return (lambda fila: fila[indice]), campo
+
+
+class Fragmentador:
+    """
+    Reparte las filas de una tabla en hojas de como máximo `filas_por_hoja`
+    filas de datos, cada una con su cabecera, fila de ejemplo y validaciones.
+
+    Pensado para libros write_only, donde el ancho de las columnas tiene que
+    fijarse antes de la primera fila: `agregar` guarda las filas en un buffer
+    (que se vuelca a disco si se agota el presupuesto) y va calculando a qué
+    hoja va cada una y el ancho de sus columnas; `finalizar` crea las hojas y
+    escribe las filas en streaming.
+    """
+
+    def __init__(self, wb, hoja, filas_por_hoja=MAX_FILAS_HOJA, clave=None, presupuesto=None):
+        self.wb = wb
+        self.hoja = hoja
+        if filas_por_hoja < 1:
+            raise ValueError(f"filas_por_hoja debe ser al menos 1 (recibido {filas_por_hoja})")
+        self.filas_por_hoja = min(filas_por_hoja, MAX_FILAS_HOJA)
+        self.clave = clave
+        self.hoy = datetime.now().strftime("%Y-%m-%d")
+        self.buffer = BufferFilas(presupuesto or PresupuestoMemoria())
+        # clave -> índice del fragmento que se está llenando
+        self.actual = {}
+        # clave -> texto que se ve en el título, y esos textos en minúsculas
+        # (Excel no distingue mayúsculas en los nombres de hoja)
+        self.claves_visibles = {}
+        self.visibles = set()
+        # Fragmentos en orden de creación: título, filas de datos y ancho máximo por columna
+        self.fragmentos = []
+
+    def _nuevo_fragmento(self, clave, numero):
+        ejemplo = [self.hoy if value == HOY else value for value in self.hoja["ejemplo"]]
+        self.fragmentos.append({
+            "titulo": titulo_fragmento(self.hoja["titulo"], clave, numero),
+            "numero": numero,
+            "filas": 0,
+            # Mismo criterio que auto_adjust_columns: len(str(valor)), también para las celdas vacías
+            "anchos": [max(len(str(a)), len(str(b))) for a, b in zip(self.hoja["columnas"], ejemplo)],
+        })
+        return len(self.fragmentos) - 1
+
+    def _clave_visible(self, clave):
+        """
+        Texto de la clave en el título. Si dos claves distintas quedan iguales al
+        recortarlas, la segunda se marca con "~2", "~3"... dentro del mismo largo.
+        """
+        visible = self.claves_visibles.get(clave)
+        if visible is None:
+            espacio = espacio_clave(self.hoja["titulo"])
+            visible = recortar_excel(clave, espacio)
+            n = 1
+            while visible.casefold() in self.visibles:
+                n += 1
+                marca = f"~{n}"
+                visible = recortar_excel(clave, espacio - len(marca)) + marca
+            self.visibles.add(visible.casefold())
+            self.claves_visibles[clave] = visible
+        return visible
+
+    def agregar(self, fila):
+        clave = self._clave_visible(limpiar_clave(self.clave(fila))) if self.clave else None
+        indice = self.actual.get(clave)
+        if indice is None or self.fragmentos[indice]["filas"] >= self.filas_por_hoja:
+            numero = self.fragmentos[indice]["numero"] + 1 if indice is not None else 1
+            if numero > MAX_FRAGMENTOS:
+                raise ValueError(f"{self.hoja['titulo']}: más de {MAX_FRAGMENTOS} hojas; aumenta filas_por_hoja")
+            indice = self.actual[clave] = self._nuevo_fragmento(clave, numero)
+
+        fragmento = self.fragmentos[indice]
+        fragmento["filas"] += 1
+        anchos = fragmento["anchos"]
+        for i in range(len(anchos)):
+            n = len(str(fila[i] if i < len(fila) else None))
+            if n > anchos[i]:
+                anchos[i] = n
+        # Columnas que no son de la plantilla (ver `extra` en finalizar)
+        anchos.extend(len(str(valor)) for valor in fila[len(anchos):])
+        self.buffer.append([indice] + list(fila))
+
+    def finalizar(self, extra=()):
+        """
+        Crea las hojas (con sus anchos y validaciones) y vuelca en ellas las filas.
+        `extra` son los nombres de las columnas que siguen a las de la plantilla
+        (las que el usuario añadió a mano). Devuelve {título de la hoja: filas de datos}.
+        """
+        if not self.fragmentos:
+            self._nuevo_fragmento(None, 1)
+        hoja = self.hoja
+        if extra:
+            hoja = {**hoja, "columnas": hoja["columnas"] + list(extra), "ejemplo": hoja["ejemplo"] + [None] * len(extra)}
+
+        # openpyxl renombraría en silencio un título repetido ("…(2)1") y la hoja
+        # dejaría de reconocerse como parte de la tabla
+        existentes = {titulo.casefold() for titulo in self.wb.sheetnames}
+        for fragmento in self.fragmentos:
+            if fragmento["titulo"].casefold() in existentes:
+                raise ValueError(f"Título de hoja repetido: {fragmento['titulo']}")
+            existentes.add(fragmento["titulo"].casefold())
+
+        hojas = []
+        for fragmento in self.fragmentos:
+            medidas = fragmento["anchos"]
+            medidas += [0] * (len(hoja["columnas"]) - len(medidas))
+            for i, col in enumerate(extra, len(self.hoja["columnas"])):
+                medidas[i] = max(medidas[i], len(str(col)))
+            anchos = {get_column_letter(i): min(n + 2, 40) for i, n in enumerate(medidas, 1)}
+            ws = create_data_sheet(self.wb, hoja, self.hoy, titulo=fragmento["titulo"], anchos=anchos)
+            add_validations(ws, hoja, last_row=max(1000, fragmento["filas"] + 2))
+            hojas.append(ws)
+
+        for indice, *fila in self.buffer:
+            hojas[indice].append(fila)
+        self.buffer.cerrar()
+        return {fragmento["titulo"]: fragmento["filas"] for fragmento in self.fragmentos}
+
+
+def export_backup_workbook(db_path="db/custom.db", filas_por_hoja=MAX_FILAS_HOJA, fragmentar_por=None, presupuesto=None):
+    """
+    Construye el backup con datos en un libro write_only (pendiente de guardar).
+    Devuelve (Workbook, {tabla: marca de sincronización}, {hoja: filas de datos}),
+    ver avanzar_marca(). `fragmentar_por` es un dict tabla -> "campo" o "campo:anio".
+    """
+    fragmentar_por = fragmentar_por or {}
+    presupuesto = presupuesto or PresupuestoMemoria()
+    conn = sqlite3.connect(db_path)
+    wb = Workbook(write_only=True)
+    create_instructions_sheet(wb.create_sheet())
+
+    marcas = {}
+    filas = {}
+    try:
+        for hoja in HOJAS_BACKUP:
+            clave, orden = funcion_clave(hoja, fragmentar_por.get(hoja["tabla"]))
+            fragmentador = Fragmentador(wb, hoja, filas_por_hoja, clave, presupuesto)
+            marca = [None, []]
+            for fila, actualizado in leer_filas(conn, hoja, orden=orden):
+                fragmentador.agregar(fila)
+                avanzar_marca(marca, actualizado, fila[0])
+            filas.update(fragmentador.finalizar())
+            marcas[hoja["tabla"]] = marca
+    finally:
+        conn.close()
+        presupuesto.cerrar()
+
+    apply_highlights(wb, HOJAS_BACKUP, fragmentos_hoja, ultimas={t: n + 2 for t, n in filas.items()})
+    return wb, marcas, filas
+
+
+def create_backup_export(db_path="db/custom.db", filename="BACKUP_DATOS.xlsx", filas_por_hoja=MAX_FILAS_HOJA, fragmentar_por=None, memoria_mb=MAX_MEMORIA_MB):
+    presupuesto = PresupuestoMemoria(memoria_mb)
+    wb, _, filas = export_backup_workbook(db_path, filas_por_hoja, fragmentar_por, presupuesto)
+
+    # Guardar archivo
+    wb.save(filename)
+    print(f"✅ Backup con datos creado exitosamente: {filename}")
+    for titulo, n in filas.items():
+        print(f"   {titulo}: {n} filas")
+    print(presupuesto.informe())
+
+
+def entero_positivo(texto):
+    """Tipo de argparse para --filas-por-hoja"""
+    valor = int(texto)
+    if valor < 1:
+        raise argparse.ArgumentTypeError("debe ser un entero mayor o igual que 1")
+    return valor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta la base de datos a un Excel de backup")
+    parser.add_argument("--db", default="db/custom.db")
+    parser.add_argument("--salida", default="BACKUP_DATOS.xlsx")
+    parser.add_argument("--filas-por-hoja", type=entero_positivo, default=MAX_FILAS_HOJA)
+    parser.add_argument("--fragmentar", action="append", metavar="TABLA=CAMPO[:anio]",
+                        help="Repartir una tabla en hojas por clave (p. ej. payments=paymentDate:anio)")
+    parser.add_argument("--memoria-mb", type=float, default=MAX_MEMORIA_MB,
+                        help="Memoria para las filas en espera; el resto se vuelca a disco")
+    args = parser.parse_args()
+
+    create_backup_export(args.db, args.salida, args.filas_por_hoja, parsear_fragmentacion(args.fragmentar), args.memoria_mb)
+
+if __name__ == "__main__":
+    main()
@@ -9,7 +9,8 @@ from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
 
-def create_database_excel():
+def build_database_excel():
+    """Construye el Excel de estructura en memoria y devuelve el Workbook sin guardarlo"""
     wb = Workbook()
     
     # Estilos
@@ -359,9 +360,14 @@ def create_database_excel():
         ws11.append(row)
     auto_adjust_columns(ws11)
     
+    return wb
+
+def create_database_excel(filename="base_datos_completa.xlsx"):
+    wb = build_database_excel()
+
     # Guardar archivo
-    wb.save("base_datos_completa.xlsx")
-    print("✅ Archivo Excel creado exitosamente: base_datos_completa.xlsx")
+    wb.save(filename)
+    print(f"✅ Archivo Excel creado exitosamente: {filename}")
 
 if __name__ == "__main__":
     create_database_excel()
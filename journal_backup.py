@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Backup incremental con journal de solo-añadir
+Sistema de Gestión Integral de Cursos
+En lugar de regenerar el Excel de backup completo cada día, los registros nuevos
+o modificados se añaden a un journal junto al libro (un segmento NDJSON por tabla
+con números de secuencia). La compactación vuelca el journal en un Excel nuevo solo
+cuando supera un tamaño o una antigüedad, así que el coste diario es proporcional
+a los cambios del día. La compactación lee el libro anterior en modo solo-lectura
+y escribe el nuevo en streaming, con el mismo presupuesto de memoria que el exporte.
+
+    BACKUP_DATOS.xlsx
+    BACKUP_DATOS.xlsx.journal/
+        estado.json        -> secuencia y marca de sincronización por tabla
+        ids.db             -> ids ya guardados, por tabla
+        payments.ndjson    -> {"seq": 12, "id": "...", "fila": [...]}
+        ...
+
+Los cambios se detectan por `updatedAt` y, además, por ids que el backup no
+ha visto nunca: import_database.ts restaura las filas con su updatedAt original,
+así que una fila restaurada o importada puede ser más antigua que la marca.
+
+Nota: no se detectan los borrados (la BD no guarda marca de borrado) ni las
+filas ya guardadas que vuelven a una versión con updatedAt anterior (p. ej. al
+restaurar un backup encima); en esos casos hay que hacer un `exportar` completo.
+
+Uso:
+    python journal_backup.py exportar     # backup completo y journal vacío
+    python journal_backup.py exportar --filas-por-hoja 500000 --fragmentar payments=paymentDate:anio
+    python journal_backup.py append       # añade los cambios desde la última vez
+    python journal_backup.py compactar [--forzar] [--memoria-mb 256]
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+from datetime import datetime, timedelta
+
+from openpyxl import Workbook, load_workbook
+from openpyxl.utils import get_column_letter
+
+from generar_plantilla_backup import HOJAS_BACKUP, create_instructions_sheet
+from exportar_backup_excel import (
+    MAX_FILAS_HOJA,
+    Fragmentador,
+    avanzar_marca,
+    campos_hoja,
+    entero_positivo,
+    es_fila_ejemplo,
+    export_backup_workbook,
+    fragmentos_hoja,
+    funcion_clave,
+    leer_filas,
+    parsear_fragmentacion,
+)
+from presupuesto_memoria import MAX_MEMORIA_MB, MapaFilas, PresupuestoMemoria
+from resaltados_excel import apply_highlights
+
+# Umbrales para compactar el journal en el Excel
+MAX_BYTES_JOURNAL = 5 * 1024 * 1024
+MAX_DIAS_JOURNAL = 7
+
+
+def ruta_journal(workbook_path):
+    return workbook_path + ".journal"
+
+
+def cargar_estado(workbook_path):
+    ruta = os.path.join(ruta_journal(workbook_path), "estado.json")
+    if not os.path.exists(ruta):
+        return {"seq": 0, "marcas": {}, "primera_entrada": None}
+    with open(ruta, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def guardar_estado(workbook_path, estado):
+    directorio = ruta_journal(workbook_path)
+    os.makedirs(directorio, exist_ok=True)
+    ruta = os.path.join(directorio, "estado.json")
+    with open(ruta + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(estado, f, ensure_ascii=False, indent=2)
+    os.replace(ruta + ".tmp", ruta)
+
+
+def segmentos(workbook_path):
+    """Rutas de los segmentos existentes, por tabla"""
+    directorio = ruta_journal(workbook_path)
+    resultado = {}
+    for hoja in HOJAS_BACKUP:
+        ruta = os.path.join(directorio, f"{hoja['tabla']}.ndjson")
+        if os.path.exists(ruta):
+            resultado[hoja["tabla"]] = ruta
+    return resultado
+
+
+def tamano_journal(workbook_path):
+    return sum(os.path.getsize(ruta) for ruta in segmentos(workbook_path).values())
+
+
+def ruta_ids(workbook_path):
+    return os.path.join(ruta_journal(workbook_path), "ids.db")
+
+
+def abrir_con_ids(db_path, workbook_path):
+    """Conexión a la BD con el registro de ids del journal adjunto como `vistos`"""
+    os.makedirs(ruta_journal(workbook_path), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.execute("ATTACH DATABASE ? AS vistos", (ruta_ids(workbook_path),))
+    for hoja in HOJAS_BACKUP:
+        conn.execute(f'CREATE TABLE IF NOT EXISTS vistos."{hoja["tabla"]}" ("id" TEXT PRIMARY KEY)')
+    return conn
+
+
+def registrar_todos(conn):
+    """Marca como vistos todos los ids que hay ahora en la BD"""
+    for hoja in HOJAS_BACKUP:
+        conn.execute(f'INSERT OR IGNORE INTO vistos."{hoja["tabla"]}" SELECT "id" FROM main."{hoja["tabla"]}"')
+    conn.commit()
+
+
+def registrar_ids(conn, tabla, ids):
+    conn.executemany(f'INSERT OR IGNORE INTO vistos."{tabla}" ("id") VALUES (?)', ((id_,) for id_ in ids))
+
+
+def guardar_libro(wb, workbook_path):
+    # Se guarda en un temporal y se renombra para no dejar nunca un Excel a medias
+    tmp = workbook_path + ".tmp.xlsx"
+    wb.save(tmp)
+    os.replace(tmp, workbook_path)
+
+
+def exportar_completo(db_path, workbook_path, filas_por_hoja=MAX_FILAS_HOJA, fragmentar_por=None, memoria_mb=MAX_MEMORIA_MB):
+    """Genera el backup completo y deja el journal vacío a partir de ese punto"""
+    presupuesto = PresupuestoMemoria(memoria_mb)
+    wb, marcas, _ = export_backup_workbook(db_path, filas_por_hoja, fragmentar_por, presupuesto)
+    guardar_libro(wb, workbook_path)
+    for ruta in segmentos(workbook_path).values():
+        os.remove(ruta)
+    if os.path.exists(ruta_ids(workbook_path)):
+        os.remove(ruta_ids(workbook_path))
+    conn = abrir_con_ids(db_path, workbook_path)
+    registrar_todos(conn)
+    conn.close()
+    # La fragmentación se guarda para que la compactación reparta igual las filas nuevas
+    guardar_estado(workbook_path, {
+        "seq": 0,
+        "marcas": marcas,
+        "primera_entrada": None,
+        "fragmentacion": {"filas_por_hoja": filas_por_hoja, "por": fragmentar_por or {}},
+    })
+    print(f"✅ Backup completo creado: {workbook_path}")
+    print(presupuesto.informe())
+
+
+def append_cambios(db_path, workbook_path, filas_por_hoja=MAX_FILAS_HOJA, fragmentar_por=None, memoria_mb=MAX_MEMORIA_MB):
+    """Añade al journal las filas nuevas o modificadas desde la última ejecución"""
+    if not os.path.exists(workbook_path):
+        exportar_completo(db_path, workbook_path, filas_por_hoja, fragmentar_por, memoria_mb)
+        return {}
+
+    estado = cargar_estado(workbook_path)
+    directorio = ruta_journal(workbook_path)
+    nuevo_registro = not os.path.exists(ruta_ids(workbook_path))
+    conn = abrir_con_ids(db_path, workbook_path)
+    if nuevo_registro:
+        # Journals anteriores al registro de ids: se da por guardado lo que ya hay
+        registrar_todos(conn)
+        print("ℹ️  Registro de ids creado con el contenido actual de la BD")
+
+    agregadas = {}
+    restauradas = {}
+    for hoja in HOJAS_BACKUP:
+        tabla = hoja["tabla"]
+        marca = estado["marcas"].get(tabla) or [None, []]
+        ya_guardados = set(marca[1])
+        desde = marca[0]
+        with open(os.path.join(directorio, f"{tabla}.ndjson"), "a", encoding="utf-8") as f:
+            def journalizar(fila, actualizado):
+                estado["seq"] += 1
+                f.write(json.dumps({"seq": estado["seq"], "id": fila[0], "fila": fila}, ensure_ascii=False) + "\n")
+                avanzar_marca(marca, actualizado, fila[0])
+
+            # 1) Filas modificadas desde la marca
+            ids = []
+            for fila, actualizado in leer_filas(conn, hoja, desde=desde):
+                if actualizado == desde and fila[0] in ya_guardados:
+                    continue
+                journalizar(fila, actualizado)
+                ids.append(fila[0])
+            registrar_ids(conn, tabla, ids)
+            n = len(ids)
+
+            # 2) Filas con ids nunca vistos aunque su updatedAt sea anterior (restauradas o importadas)
+            ids = []
+            for fila, actualizado in leer_filas(conn, hoja, no_vistos=f'vistos."{tabla}"'):
+                journalizar(fila, actualizado)
+                ids.append(fila[0])
+            registrar_ids(conn, tabla, ids)
+            n += len(ids)
+            if ids:
+                restauradas[tabla] = len(ids)
+
+            f.flush()
+            os.fsync(f.fileno())
+        # Los ids se confirman después de escribir el segmento en disco
+        conn.commit()
+        if n:
+            agregadas[tabla] = n
+        estado["marcas"][tabla] = marca
+
+    conn.close()
+    if agregadas and not estado["primera_entrada"]:
+        estado["primera_entrada"] = datetime.now().isoformat(timespec="seconds")
+    # El estado se escribe después de los segmentos: si algo falla a mitad, la
+    # siguiente ejecución vuelve a añadir esas filas y la compactación las deduplica
+    guardar_estado(workbook_path, estado)
+
+    total = sum(agregadas.values())
+    print(f"📝 Journal actualizado: {total} filas ({', '.join(f'{t}: {n}' for t, n in agregadas.items()) or 'sin cambios'})")
+    if restauradas:
+        print(f"   de ellas con updatedAt anterior a la marca (restauradas o importadas): {', '.join(f'{t}: {n}' for t, n in restauradas.items())}")
+    print("ℹ️  No se detectan borrados ni filas que vuelven a una versión anterior; tras restaurar un backup haz un `exportar` completo")
+    return agregadas
+
+
+def debe_compactar(workbook_path, max_bytes=MAX_BYTES_JOURNAL, max_dias=MAX_DIAS_JOURNAL):
+    if tamano_journal(workbook_path) >= max_bytes:
+        return True
+    primera = cargar_estado(workbook_path)["primera_entrada"]
+    return bool(primera) and datetime.now() - datetime.fromisoformat(primera) >= timedelta(days=max_dias)
+
+
+def leer_segmento(ruta, presupuesto):
+    """
+    Última versión de cada id en el segmento (gana la secuencia más alta), en un
+    MapaFilas que cuenta contra el presupuesto y se vuelca a disco si no cabe.
+    """
+    ultimas = MapaFilas(presupuesto)
+    if ruta:
+        with open(ruta, encoding="utf-8") as f:
+            for linea in f:
+                if linea.strip():
+                    entrada = json.loads(linea)
+                    ultimas.poner(entrada["id"], entrada["fila"])
+    return ultimas
+
+
+def filas_hojas(wb, titulos, hoja, extra):
+    """
+    Filas de datos de las hojas de una tabla en un libro de solo-lectura. La
+    fila 2 se salta solo si es la de ejemplo (el usuario puede haberla borrado).
+
+    Las columnas que el usuario añadió detrás de las de la plantilla se conservan:
+    `extra` va acumulando sus nombres (la cabecera o, si está vacía, la letra) y
+    los valores de cada fila se colocan en ese orden, aunque cada hoja las tenga
+    en otra posición.
+    """
+    columnas = len(hoja["columnas"])
+    campos = len(campos_hoja(hoja))
+    for titulo in titulos:
+        filas = wb[titulo].iter_rows(values_only=True)
+        cabecera = next(filas, ())
+        destinos = {}
+        for i, nombre in enumerate(cabecera[columnas:], columnas):
+            if nombre is not None and str(nombre).strip():
+                destinos[i] = columna_extra(extra, str(nombre).strip())
+        for n, fila in enumerate(filas, 2):
+            if all(v is None for v in fila):
+                continue
+            if n == 2 and es_fila_ejemplo(fila[:campos], hoja):
+                continue
+            nueva = list(fila[:columnas])
+            for i, valor in enumerate(fila[columnas:], columnas):
+                if valor is None:
+                    continue
+                if i not in destinos:
+                    destinos[i] = columna_extra(extra, f"Columna {get_column_letter(i + 1)}")
+                posicion = columnas + destinos[i]
+                nueva += [None] * (posicion + 1 - len(nueva))
+                nueva[posicion] = valor
+            yield nueva
+
+
+def columna_extra(extra, nombre):
+    """Posición de `nombre` dentro de `extra`, añadiéndolo si es nuevo"""
+    if nombre not in extra:
+        extra.append(nombre)
+    return extra.index(nombre)
+
+
+def hojas_propias(wb, titulos_conocidos):
+    """
+    Hojas del libro que no son de ninguna tabla ni las instrucciones (p. ej. unas
+    notas del usuario). Falla si alguna no se puede copiar celda a celda.
+    """
+    propias = [titulo for titulo in wb.sheetnames if titulo not in titulos_conocidos]
+    no_copiables = [titulo for titulo in propias if not hasattr(wb[titulo], "iter_rows")]
+    if no_copiables:
+        raise ValueError(f"No se puede compactar sin perder las hojas: {', '.join(no_copiables)}")
+    return propias
+
+
+def compactar(workbook_path, forzar=False, memoria_mb=MAX_MEMORIA_MB):
+    """
+    Vuelca el journal en un Excel nuevo si supera los umbrales (o si se fuerza).
+    Las filas del libro anterior se leen en streaming; las que tienen una versión
+    en el journal se sustituyen (conservando NOTAS) y las nuevas van al final.
+    Las columnas y hojas que el usuario añadió a mano se copian con sus valores.
+    """
+    pendientes = {t: r for t, r in segmentos(workbook_path).items() if os.path.getsize(r)}
+    if not pendientes or not (forzar or debe_compactar(workbook_path)):
+        return False
+
+    fragmentacion = cargar_estado(workbook_path).get("fragmentacion", {})
+    presupuesto = PresupuestoMemoria(memoria_mb)
+    anterior = load_workbook(workbook_path, read_only=True)
+    wb = Workbook(write_only=True)
+    instrucciones = wb.create_sheet()
+    create_instructions_sheet(instrucciones)
+    filas = {}
+    extras = {}
+    try:
+        titulos_tablas = {hoja["tabla"]: fragmentos_hoja(anterior.sheetnames, hoja) for hoja in HOJAS_BACKUP}
+        conocidos = {instrucciones.title}.union(*titulos_tablas.values())
+        propias = hojas_propias(anterior, conocidos)
+
+        for hoja in HOJAS_BACKUP:
+            ruta = pendientes.get(hoja["tabla"])
+            cambios = leer_segmento(ruta, presupuesto)
+
+            clave, _ = funcion_clave(hoja, fragmentacion.get("por", {}).get(hoja["tabla"]))
+            fragmentador = Fragmentador(wb, hoja, fragmentacion.get("filas_por_hoja", MAX_FILAS_HOJA), clave, presupuesto)
+            extra = extras[hoja["titulo"]] = []
+            for fila in filas_hojas(anterior, titulos_tablas[hoja["tabla"]], hoja, extra):
+                nueva = cambios.sacar(fila[0])
+                fragmentador.agregar(fila if nueva is None else nueva + fila[len(nueva):])
+            for fila in cambios.values():
+                fragmentador.agregar(fila)
+            cambios.cerrar()
+            filas.update(fragmentador.finalizar(extra))
+
+        # Las hojas del usuario se copian al final, solo los valores (y las fórmulas)
+        for titulo in propias:
+            ws = wb.create_sheet(titulo)
+            for fila in anterior[titulo].iter_rows(values_only=True):
+                ws.append(fila)
+    finally:
+        anterior.close()
+        presupuesto.cerrar()
+
+    # Los rangos del formato condicional crecen con las filas y los fragmentos nuevos
+    apply_highlights(wb, HOJAS_BACKUP, fragmentos_hoja, ultimas={t: n + 2 for t, n in filas.items()})
+    guardar_libro(wb, workbook_path)
+    for ruta in segmentos(workbook_path).values():
+        os.remove(ruta)
+    estado = cargar_estado(workbook_path)
+    estado["primera_entrada"] = None
+    guardar_estado(workbook_path, estado)
+    print(f"🗜️  Journal compactado en {workbook_path}")
+    if propias:
+        print(f"📎 Hojas propias conservadas (solo valores, sin formato): {', '.join(propias)}")
+    for titulo, extra in extras.items():
+        if extra:
+            print(f"📎 {titulo}: columnas añadidas conservadas: {', '.join(extra)}")
+    print(presupuesto.informe())
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backup incremental con journal")
+    parser.add_argument("accion", choices=["exportar", "append", "compactar"])
+    parser.add_argument("--db", default="db/custom.db")
+    parser.add_argument("--workbook", default="BACKUP_DATOS.xlsx")
+    parser.add_argument("--forzar", action="store_true", help="Compactar aunque no se superen los umbrales")
+    parser.add_argument("--filas-por-hoja", type=entero_positivo, default=MAX_FILAS_HOJA)
+    parser.add_argument("--fragmentar", action="append", metavar="TABLA=CAMPO[:anio]",
+                        help="Repartir una tabla en hojas por clave (p. ej. payments=paymentDate:anio)")
+    parser.add_argument("--memoria-mb", type=float, default=MAX_MEMORIA_MB,
+                        help="Memoria para las filas en espera; el resto se vuelca a disco")
+    args = parser.parse_args()
+
+    fragmentar_por = parsear_fragmentacion(args.fragmentar)
+    if args.accion == "exportar":
+        exportar_completo(args.db, args.workbook, args.filas_por_hoja, fragmentar_por, args.memoria_mb)
+    elif args.accion == "append":
+        append_cambios(args.db, args.workbook, args.filas_por_hoja, fragmentar_por, args.memoria_mb)
+        compactar(args.workbook, forzar=args.forzar, memoria_mb=args.memoria_mb)
+    else:
+        if not compactar(args.workbook, forzar=args.forzar, memoria_mb=args.memoria_mb):
+            print("ℹ️  No hay nada que compactar")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Lector tipado de plantillas de backup rellenas
+Sistema de Gestión Integral de Cursos
+Recorre las hojas de un Excel con la estructura de PLANTILLA_BACKUP_DATOS.xlsx en
+modo solo-lectura y devuelve registros tipados (User, Student, Course, Payment...)
+de forma perezosa: SI/NO -> bool, fechas -> date/datetime, "450.00" -> float.
+Se salta la fila de ejemplo (si sigue en la fila 2) y la columna NOTAS, y las tablas repartidas
+en varias hojas ("💰 Payments (2)", "💰 Payments 2024"...) se leen como una sola.
+
+Los registros son namedtuple (respaldados por una tupla, sin __dict__) y los
+convertidores se deciden una vez por columna, no por celda.
+
+    with LectorPlantilla("PLANTILLA_BACKUP_DATOS.xlsx") as lector:
+        for pago in lector.registros("Payment"):
+            print(pago.id, pago.amount, pago.paymentDate)
+
+LectorBD ofrece los mismos registros leídos directamente de db/custom.db.
+"""
+
+import sqlite3
+import sys
+from collections import namedtuple
+from itertools import chain
+from datetime import date, datetime
+
+from openpyxl import load_workbook
+from openpyxl.utils import get_column_letter
+
+from generar_plantilla_backup import HOJAS_BACKUP
+from exportar_backup_excel import campos_hoja, es_fila_ejemplo, fragmentos_hoja, leer_filas
+
+# Tipo de cada campo que no es texto (los SI/NO salen de las validaciones de la hoja)
+TIPOS_CAMPOS = {
+    "birthDate": "fecha",
+    "createdAt": "fecha",
+    "startDate": "fecha",
+    "endDate": "fecha",
+    "enrollmentDate": "fecha",
+    "paymentDate": "fecha",
+    "dueDate": "fecha",
+    "paidDate": "fecha",
+    "expiryDate": "fecha",
+    "startTime": "fecha_hora",
+    "endTime": "fecha_hora",
+    "duration": "entero",
+    "maxStudents": "entero",
+    "quantity": "entero",
+    "maxUsers": "entero",
+    "currentUsers": "entero",
+    "hourlyRate": "decimal",
+    "price": "decimal",
+    "unitPrice": "decimal",
+    "progress": "decimal",
+    "grade": "decimal",
+    "amount": "decimal",
+}
+
+HOJAS_POR_MODELO = {hoja["modelo"]: hoja for hoja in HOJAS_BACKUP}
+
+# Una clase de registro por modelo: User, Student, Course, Payment...
+REGISTROS = {
+    hoja["modelo"]: namedtuple(hoja["modelo"], campos_hoja(hoja))
+    for hoja in HOJAS_BACKUP
+}
+
+
+def _vacio(v):
+    return v is None or (isinstance(v, str) and not v.strip())
+
+
+def a_texto(v):
+    if _vacio(v):
+        return None
+    return v if isinstance(v, str) else str(v)
+
+
+def a_bool(v):
+    if _vacio(v):
+        return None
+    if isinstance(v, bool):
+        return v
+    texto = str(v).strip().upper()
+    if texto in ("SI", "SÍ"):
+        return True
+    if texto == "NO":
+        return False
+    raise ValueError("se esperaba SI o NO")
+
+
+def a_fecha(v):
+    if _vacio(v):
+        return None
+    if isinstance(v, datetime):
+        return v.date()
+    if isinstance(v, date):
+        return v
+    return date.fromisoformat(str(v).strip()[:10])
+
+
+def a_fecha_hora(v):
+    if _vacio(v):
+        return None
+    if isinstance(v, datetime):
+        return v
+    if isinstance(v, date):
+        return datetime(v.year, v.month, v.day)
+    return datetime.fromisoformat(str(v).strip())
+
+
+def a_entero(v):
+    if _vacio(v):
+        return None
+    if isinstance(v, int):
+        return v
+    numero = float(str(v).strip().replace(",", ".")) if isinstance(v, str) else float(v)
+    if not numero.is_integer():
+        raise ValueError("se esperaba un número entero")
+    return int(numero)
+
+
+def a_decimal(v):
+    if _vacio(v):
+        return None
+    if isinstance(v, (int, float)):
+        return float(v)
+    return float(str(v).strip().replace(",", "."))
+
+
+CONVERTIDORES = {
+    "texto": a_texto,
+    "bool": a_bool,
+    "fecha": a_fecha,
+    "fecha_hora": a_fecha_hora,
+    "entero": a_entero,
+    "decimal": a_decimal,
+}
+
+
+def tipos_hoja(hoja):
+    """Tipo de cada campo de la hoja, en el orden de la plantilla"""
+    columnas_bool = {col for col, valores in hoja["validaciones"] if valores == "SI,NO"}
+    tipos = []
+    for i, campo in enumerate(campos_hoja(hoja)):
+        if get_column_letter(i + 1) in columnas_bool:
+            tipos.append("bool")
+        else:
+            tipos.append(TIPOS_CAMPOS.get(campo, "texto"))
+    return tipos
+
+
+def compilar_plan(hoja, cabecera):
+    """
+    Empareja cada campo del registro con su posición en la cabecera real de la
+    hoja y su convertidor. Se calcula una vez por hoja.
+    """
+    posiciones = {}
+    for i, col in enumerate(cabecera):
+        if isinstance(col, str):
+            posiciones.setdefault(col.strip().rstrip("*"), i)
+
+    plan = []
+    for campo, tipo in zip(campos_hoja(hoja), tipos_hoja(hoja)):
+        if campo not in posiciones:
+            raise ValueError(f"{hoja['titulo']}: falta la columna '{campo}' en la cabecera")
+        plan.append((posiciones[campo], campo, CONVERTIDORES[tipo]))
+    return plan
+
+
+def leer_registros_hoja(ws, hoja, primera_fila=2):
+    """
+    Genera los registros tipados de una hoja. La fila 2 se salta solo si es la
+    de ejemplo: si el usuario la ha borrado, ahí está su primer registro.
+    """
+    cabecera = next(ws.iter_rows(min_row=1, max_row=1, values_only=True), ())
+    plan = compilar_plan(hoja, cabecera)
+    crear = REGISTROS[hoja["modelo"]]._make
+    ultima_col = max(pos for pos, _, _ in plan) + 1
+
+    for n, fila in enumerate(ws.iter_rows(min_row=primera_fila, max_col=ultima_col, values_only=True), primera_fila):
+        if all(_vacio(v) for v in fila):
+            continue
+        if n == primera_fila and es_fila_ejemplo([fila[pos] for pos, _, _ in plan], hoja):
+            continue
+        try:
+            yield crear([conv(fila[pos]) for pos, _, conv in plan])
+        except (ValueError, TypeError) as e:
+            # Se busca la columna culpable solo cuando hay error
+            for pos, campo, conv in plan:
+                try:
+                    conv(fila[pos])
+                except (ValueError, TypeError):
+                    raise ValueError(f"{hoja['titulo']} fila {n}, columna '{campo}': valor {fila[pos]!r} no válido ({e})") from e
+            raise
+
+
+class LectorPlantilla:
+    """Abre una plantilla rellena en modo solo-lectura y lee sus hojas como registros"""
+
+    def __init__(self, ruta):
+        self.wb = load_workbook(ruta, read_only=True, data_only=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.wb.close()
+
+    def registros(self, modelo):
+        hoja = HOJAS_POR_MODELO[modelo]
+        return chain.from_iterable(
+            leer_registros_hoja(self.wb[titulo], hoja)
+            for titulo in fragmentos_hoja(self.wb.sheetnames, hoja)
+        )
+
+
+class LectorBD:
+    """
+    Mismos registros que LectorPlantilla pero leídos de la base de datos: las
+    filas pasan por la conversión del exporte y después por los convertidores
+    de la plantilla, así que los tipos coinciden.
+    """
+
+    def __init__(self, db_path="db/custom.db"):
+        self.conn = sqlite3.connect(db_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def registros(self, modelo):
+        hoja = HOJAS_POR_MODELO[modelo]
+        convertidores = [CONVERTIDORES[tipo] for tipo in tipos_hoja(hoja)]
+        crear = REGISTROS[modelo]._make
+        for fila, _ in leer_filas(self.conn, hoja):
+            yield crear([conv(v) for conv, v in zip(convertidores, fila)])
+
+
+def main():
+    ruta = sys.argv[1] if len(sys.argv) > 1 else "PLANTILLA_BACKUP_DATOS.xlsx"
+    with LectorPlantilla(ruta) as lector:
+        for modelo in REGISTROS:
+            total = sum(1 for _ in lector.registros(modelo))
+            print(f"   {modelo}: {total} registros")
+
+if __name__ == "__main__":
+    main()
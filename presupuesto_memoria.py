@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Presupuesto de memoria y buffers con volcado a disco
+Sistema de Gestión Integral de Cursos
+Las exportaciones grandes necesitan guardar las filas de una tabla antes de
+escribirlas (el ancho de las columnas se decide cuando se conocen todas) y la
+compactación necesita un índice id -> fila con los cambios del journal. Los
+buffers y los mapas reservan memoria contra un presupuesto común y, cuando se
+agota, vuelcan su contenido a una base SQLite temporal en disco. Al final se
+informa del pico.
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Presupuesto por defecto para los buffers de filas
+MAX_MEMORIA_MB = 256
+
+# Filas que se escriben a disco en cada lote al volcar
+LOTE_VOLCADO = 5000
+
+
+def estimar_bytes(fila):
+    """Estimación barata del tamaño en memoria de una fila (lista de valores simples)"""
+    total = 56 + 8 * len(fila)
+    for valor in fila:
+        if isinstance(valor, str):
+            total += 49 + len(valor)
+        elif valor is not None:
+            total += 24
+    return total
+
+
+def pico_proceso_mb():
+    """Pico de memoria residente del proceso en MB (None si el sistema no lo ofrece)"""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo da en KB y macOS en bytes
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+
+
+class PresupuestoMemoria:
+    """Lleva la cuenta de la memoria reservada por los buffers y del pico alcanzado"""
+
+    def __init__(self, max_mb=MAX_MEMORIA_MB, directorio=None):
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.directorio = directorio
+        self.usado = 0
+        self.pico = 0
+        self.filas_volcadas = 0
+        self._conn = None
+        self._ruta = None
+        self._tablas = 0
+
+    def reservar(self, n):
+        if self.usado + n > self.max_bytes:
+            return False
+        self.usado += n
+        self.pico = max(self.pico, self.usado)
+        return True
+
+    def liberar(self, n):
+        self.usado -= n
+
+    def conexion(self):
+        """Base SQLite temporal en disco, creada la primera vez que hace falta volcar"""
+        if self._conn is None:
+            fd, self._ruta = tempfile.mkstemp(prefix="volcado_", suffix=".db", dir=self.directorio)
+            os.close(fd)
+            self._conn = sqlite3.connect(self._ruta)
+            self._conn.execute("PRAGMA journal_mode=OFF")
+            self._conn.execute("PRAGMA synchronous=OFF")
+        return self._conn
+
+    def nueva_tabla(self):
+        self._tablas += 1
+        nombre = f"buffer_{self._tablas}"
+        self.conexion().execute(f"CREATE TABLE {nombre} (fila TEXT NOT NULL)")
+        return nombre
+
+    def nueva_tabla_clave(self):
+        self._tablas += 1
+        nombre = f"mapa_{self._tablas}"
+        self.conexion().execute(f"CREATE TABLE {nombre} (id TEXT PRIMARY KEY, orden INTEGER NOT NULL, fila TEXT NOT NULL)")
+        return nombre
+
+    def cerrar(self):
+        if self._conn is not None:
+            self._conn.close()
+            os.remove(self._ruta)
+            self._conn = None
+
+    def informe(self):
+        texto = (f"📈 Memoria: pico de buffers {self.pico / (1024 * 1024):.1f} MB "
+                 f"de {self.max_bytes / (1024 * 1024):.1f} MB, {self.filas_volcadas} filas volcadas a disco")
+        pico = pico_proceso_mb()
+        if pico is not None:
+            texto += f", pico del proceso {pico:.1f} MB"
+        return texto
+
+
+class BufferFilas:
+    """
+    Lista de filas de solo-añadir que se vuelca a disco cuando el presupuesto se
+    agota. Al recorrerla devuelve las filas en el orden en que se añadieron:
+    primero las volcadas y después las que siguen en memoria.
+    """
+
+    def __init__(self, presupuesto):
+        self.presupuesto = presupuesto
+        self._memoria = []
+        self._bytes = 0
+        self._tabla = None
+        self._en_disco = 0
+
+    def append(self, fila):
+        n = estimar_bytes(fila)
+        if not self.presupuesto.reservar(n):
+            self._volcar()
+            if not self.presupuesto.reservar(n):
+                # Ni vacío cabe: la fila va directa a disco
+                self._escribir([fila])
+                return
+        self._memoria.append(fila)
+        self._bytes += n
+
+    def _escribir(self, filas):
+        if self._tabla is None:
+            self._tabla = self.presupuesto.nueva_tabla()
+        conn = self.presupuesto.conexion()
+        for i in range(0, len(filas), LOTE_VOLCADO):
+            conn.executemany(
+                f"INSERT INTO {self._tabla} (fila) VALUES (?)",
+                ((json.dumps(fila, ensure_ascii=False),) for fila in filas[i:i + LOTE_VOLCADO]),
+            )
+        self._en_disco += len(filas)
+        self.presupuesto.filas_volcadas += len(filas)
+
+    def _volcar(self):
+        if self._memoria:
+            self._escribir(self._memoria)
+            self._memoria = []
+            self.presupuesto.liberar(self._bytes)
+            self._bytes = 0
+
+    def __len__(self):
+        return self._en_disco + len(self._memoria)
+
+    def __iter__(self):
+        if self._tabla is not None:
+            cursor = self.presupuesto.conexion().execute(f"SELECT fila FROM {self._tabla} ORDER BY rowid")
+            for (fila,) in cursor:
+                yield json.loads(fila)
+        yield from self._memoria
+
+    def cerrar(self):
+        """Libera la memoria reservada y borra la tabla temporal"""
+        self.presupuesto.liberar(self._bytes)
+        self._memoria = []
+        self._bytes = 0
+        if self._tabla is not None:
+            self.presupuesto.conexion().execute(f"DROP TABLE {self._tabla}")
+            self._tabla = None
+
+
+class MapaFilas:
+    """
+    Diccionario id -> fila con presupuesto de memoria. Si una fila se vuelve a
+    poner gana la última, y al recorrerlo devuelve las que quedan en el orden en
+    que apareció cada id por primera vez (como un dict).
+    """
+
+    def __init__(self, presupuesto):
+        self.presupuesto = presupuesto
+        self._memoria = {}      # id -> (orden, fila, bytes)
+        self._bytes = 0
+        self._orden = 0
+        self._tabla = None
+
+    def _sql(self, consulta, params=()):
+        return self.presupuesto.conexion().execute(consulta.format(tabla=self._tabla), params)
+
+    def poner(self, id_, fila):
+        previo = self._memoria.get(id_)
+        if previo is None and self._tabla is not None:
+            cursor = self._sql("UPDATE {tabla} SET fila = ? WHERE id = ?", (json.dumps(fila, ensure_ascii=False), id_))
+            if cursor.rowcount:
+                return
+        n = estimar_bytes(fila) + 49 + len(str(id_))
+        if previo is not None:
+            orden = previo[0]
+            self.presupuesto.liberar(previo[2])
+            self._bytes -= previo[2]
+        else:
+            self._orden += 1
+            orden = self._orden
+        if not self.presupuesto.reservar(n):
+            # Se vuelca todo lo que hay en memoria (incluida esta fila)
+            self._memoria[id_] = (orden, fila, 0)
+            self._volcar()
+            return
+        self._memoria[id_] = (orden, fila, n)
+        self._bytes += n
+
+    def _volcar(self):
+        if self._tabla is None:
+            self._tabla = self.presupuesto.nueva_tabla_clave()
+        filas = [(id_, orden, json.dumps(fila, ensure_ascii=False)) for id_, (orden, fila, _) in self._memoria.items()]
+        for i in range(0, len(filas), LOTE_VOLCADO):
+            self.presupuesto.conexion().executemany(
+                f"INSERT INTO {self._tabla} (id, orden, fila) VALUES (?, ?, ?)", filas[i:i + LOTE_VOLCADO])
+        self.presupuesto.filas_volcadas += len(filas)
+        self.presupuesto.liberar(self._bytes)
+        self._memoria = {}
+        self._bytes = 0
+
+    def sacar(self, id_, defecto=None):
+        """Quita y devuelve la fila de `id_` (o `defecto` si no está)"""
+        previo = self._memoria.pop(id_, None)
+        if previo is not None:
+            self.presupuesto.liberar(previo[2])
+            self._bytes -= previo[2]
+            return previo[1]
+        if self._tabla is not None:
+            encontrada = self._sql("SELECT fila FROM {tabla} WHERE id = ?", (id_,)).fetchone()
+            if encontrada:
+                self._sql("DELETE FROM {tabla} WHERE id = ?", (id_,))
+                return json.loads(encontrada[0])
+        return defecto
+
+    def __len__(self):
+        en_disco = self._sql("SELECT COUNT(*) FROM {tabla}").fetchone()[0] if self._tabla else 0
+        return en_disco + len(self._memoria)
+
+    def values(self):
+        # Lo volcado siempre apareció antes que lo que sigue en memoria
+        if self._tabla is not None:
+            for (fila,) in self._sql("SELECT fila FROM {tabla} ORDER BY orden"):
+                yield json.loads(fila)
+        for _, fila, _ in sorted(self._memoria.values(), key=lambda e: e[0]):
+            yield fila
+
+    def cerrar(self):
+        """Libera la memoria reservada y borra la tabla temporal"""
+        self.presupuesto.liberar(self._bytes)
+        self._memoria = {}
+        self._bytes = 0
+        if self._tabla is not None:
+            self._sql("DROP TABLE {tabla}")
+            self._tabla = None
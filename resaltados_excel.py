@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Resaltado de estados en las hojas de datos mediante formato condicional
+Sistema de Gestión Integral de Cursos
+En vez de pintar celda a celda (un estilo por celda), cada resaltado es una única
+regla de formato condicional sobre el rango de la hoja, así que el tamaño del
+fichero y el tiempo de escritura no dependen de cuántas filas cumplan la regla:
+    • Pagos vencidos (status = "OVERDUE")
+    • Licencias de software caducadas o que caducan en los próximos 30 días
+    • Cursos completos (matrículas no anuladas >= maxStudents)
+"""
+
+from openpyxl.formatting.formatting import ConditionalFormattingList
+from openpyxl.formatting.rule import FormulaRule
+from openpyxl.styles import Font, PatternFill
+from openpyxl.utils import get_column_letter
+
+# Estilos de resaltado (colores estándar de Excel para "malo" / "neutral")
+fill_rojo = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
+font_rojo = Font(color="9C0006")
+fill_ambar = PatternFill(start_color="FFEB9C", end_color="FFEB9C", fill_type="solid")
+font_ambar = Font(color="9C5700")
+fill_naranja = PatternFill(start_color="F8CBAD", end_color="F8CBAD", fill_type="solid")
+
+# Días de antelación para avisar de licencias por caducar
+DIAS_AVISO_LICENCIA = 30
+
+
+def _fecha(ref):
+    # Las fechas se escriben como texto "YYYY-MM-DD"; si alguien las teclea como
+    # fecha de Excel ya son un número
+    return f"IF(ISNUMBER({ref}),{ref},DATE(LEFT({ref},4),MID({ref},6,2),MID({ref},9,2)))"
+
+
+def _matriculas_activas(ref, hojas):
+    # Suma sobre todos los fragmentos de la hoja de matrículas
+    return "+".join(
+        f"COUNTIFS('{titulo}'!$C:$C,{ref['id']},'{titulo}'!$E:$E,\"<>DROPPED\")"
+        for titulo in hojas.get("Enrollment", [])
+    ) or "0"
+
+
+# Reglas por modelo: (descripción, función (refs de la fila, hojas del libro) -> fórmula, fill, font)
+# `ref` lleva cada campo a su referencia en la primera fila de datos, p. ej. ref["status"] = "$J3"
+RESALTADOS = {
+    "Payment": [
+        ("Pago vencido",
+         lambda ref, hojas: f'{ref["status"]}="OVERDUE"',
+         fill_rojo, font_rojo),
+    ],
+    "Software": [
+        ("Licencia caducada",
+         lambda ref, hojas: f'AND({ref["expiryDate"]}<>"",{_fecha(ref["expiryDate"])}<TODAY())',
+         fill_rojo, font_rojo),
+        (f"Licencia que caduca en {DIAS_AVISO_LICENCIA} días",
+         lambda ref, hojas: f'AND({ref["expiryDate"]}<>"",{_fecha(ref["expiryDate"])}<TODAY()+{DIAS_AVISO_LICENCIA})',
+         fill_ambar, font_ambar),
+    ],
+    "Course": [
+        ("Curso completo",
+         lambda ref, hojas: f'AND({ref["maxStudents"]}<>"",{_matriculas_activas(ref, hojas)}>=VALUE({ref["maxStudents"]}))',
+         fill_naranja, None),
+    ],
+}
+
+
+def referencias(hoja, first_row=3):
+    """Campo -> referencia con la columna fija y la fila relativa ("$J3")"""
+    return {
+        col.rstrip("*"): f"${get_column_letter(i)}{first_row}"
+        for i, col in enumerate(hoja["columnas"], 1)
+    }
+
+
+def add_highlights(ws, hoja, hojas, first_row=3, last_row=1000):
+    """
+    Sustituye el formato condicional de la hoja por las reglas de su modelo,
+    aplicadas a la fila completa entre `first_row` y `last_row`.
+    `hojas` es modelo -> títulos de sus hojas (para las reglas entre hojas).
+    """
+    reglas = RESALTADOS.get(hoja["modelo"])
+    if not reglas:
+        return
+    ws.conditional_formatting = ConditionalFormattingList()
+    rango = f"A{first_row}:{get_column_letter(len(hoja['columnas']))}{last_row}"
+    ref = referencias(hoja, first_row)
+    # La primera regla que se cumple gana (p. ej. "caducada" antes que "por caducar")
+    for _, formula, fill, font in reglas:
+        ws.conditional_formatting.add(
+            rango,
+            FormulaRule(formula=[formula(ref, hojas)], fill=fill, font=font, stopIfTrue=True),
+        )
+
+
+def _hoja_unica(titulos, hoja):
+    return [hoja["titulo"]] if hoja["titulo"] in titulos else []
+
+
+def apply_highlights(wb, hojas_backup, fragmentos=_hoja_unica, ultimas=None):
+    """
+    Aplica los resaltados a todas las hojas de datos del libro. `fragmentos`
+    devuelve los títulos de las hojas de una tabla (por defecto, solo la hoja
+    base; los exportes con datos pasan fragmentos_hoja). `ultimas` da la última
+    fila de cada hoja cuando no se puede consultar (libros write_only).
+    """
+    ultimas = ultimas or {}
+    hojas = {hoja["modelo"]: fragmentos(wb.sheetnames, hoja) for hoja in hojas_backup}
+    for hoja in hojas_backup:
+        if hoja["modelo"] not in RESALTADOS:
+            continue
+        for titulo in hojas[hoja["modelo"]]:
+            ws = wb[titulo]
+            add_highlights(ws, hoja, hojas, last_row=max(1000, ultimas.get(titulo) or ws.max_row))
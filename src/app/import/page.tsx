@@ -35,6 +35,15 @@ interface ImportResult {
     total: number
 }
 
+// Hojas de una tabla: el título base, con una clave opcional ("💰 Payments 2024")
+// y un número de fragmento opcional ("💰 Payments (2)"), igual que patron_fragmentos
+// en exportar_backup_excel.py
+const sheetFragments = (sheetNames: string[], base: string) => {
+    const escaped = base.replace(/[.*+?^${}()|[\]\\]/g, '\\$&')
+    const pattern = new RegExp(`^${escaped}(?: [^()]+?)?(?: \\(\\d+\\))?$`, 'u')
+    return sheetNames.filter(name => pattern.test(name))
+}
+
 export default function ImportPage() {
     const [loading, setLoading] = useState(false)
     const [progress, setProgress] = useState(0)
@@ -78,14 +87,26 @@ export default function ImportPage() {
                 ]
 
                 const finalResults: ImportResult[] = []
-                let totalSteps = entities.filter(e => workbook.SheetNames.includes(e.sheet)).length
+                let totalSteps = entities.filter(e => sheetFragments(workbook.SheetNames, e.sheet).length > 0).length
                 let currentStep = 0
 
                 for (const entity of entities) {
-                    if (workbook.SheetNames.includes(entity.sheet)) {
+                    // Las tablas grandes del backup se reparten en varias hojas: se juntan sus filas
+                    const sheetNames = sheetFragments(workbook.SheetNames, entity.sheet)
+                    if (sheetNames.length > 0) {
                         currentStep++
-                        const sheet = workbook.Sheets[entity.sheet]
-                        const jsonData = XLSX.utils.sheet_to_json(sheet)
+                        // Cada fragmento repite la fila de ejemplo: un mismo id solo se importa una vez
+                        const seenIds = new Set<string>()
+                        const jsonData = sheetNames
+                            .flatMap(name => XLSX.utils.sheet_to_json(workbook.Sheets[name]))
+                            .filter((row: any) => {
+                                const idKey = Object.keys(row).find(key => key.replace('*', '').trim().toLowerCase() === 'id')
+                                if (!idKey) return true
+                                const id = String(row[idKey])
+                                if (seenIds.has(id)) return false
+                                seenIds.add(id)
+                                return true
+                            })
 
                         // Eliminar la fila de ejemplo (si existe y tiene el formato de ejemplo)
                         const filteredData = jsonData.filter((row: any) => {
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Worker persistente para generar los Excel bajo demanda
+Sistema de Gestión Integral de Cursos
+Mantiene openpyxl, los estilos y la definición de las hojas cargados en memoria
+y atiende peticiones JSON (una por línea) por stdin/stdout o por un socket Unix,
+para que server.ts o una ruta API no tengan que lanzar un intérprete por petición.
+
+Protocolo (una línea JSON por petición y por respuesta):
+    -> {"id": 1, "accion": "plantilla_backup"}
+    <- {"id": 1, "ok": true, "cache": false, "ms": 412.3, "xlsx": "<base64>"}
+    -> {"id": 2, "accion": "estructura_bd", "ruta": "/tmp/estructura.xlsx"}
+    <- {"id": 2, "ok": true, "cache": false, "ms": 95.1, "ruta": "/tmp/estructura.xlsx"}
+    -> {"id": 3, "accion": "ping"}
+    <- {"id": 3, "ok": true, "pong": true}
+
+Uso:
+    python worker_excel.py                         # stdin/stdout
+    python worker_excel.py --socket /tmp/excel.sock
+"""
+
+import argparse
+import base64
+import io
+import json
+import os
+import signal
+import socketserver
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from generar_plantilla_backup import build_backup_template
+from generar_excel_db import build_database_excel
+
+# Cada generador recibe el día (la clave de la cache). La plantilla lo usa como
+# "ÚLTIMA ACTUALIZACIÓN" en lugar de la hora, que quedaría fija todo el día en cache
+GENERADORES = {
+    "plantilla_backup": lambda dia: build_backup_template(actualizado=dia),
+    "estructura_bd": lambda dia: build_database_excel(),
+}
+
+
+class CacheLRU:
+    """Cache en memoria de los .xlsx generados, con expulsión del menos usado"""
+
+    def __init__(self, max_entradas=16):
+        self.max_entradas = max_entradas
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, clave):
+        with self._lock:
+            if clave not in self._datos:
+                return None
+            self._datos.move_to_end(clave)
+            return self._datos[clave]
+
+    def put(self, clave, valor):
+        with self._lock:
+            self._datos[clave] = valor
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+
+    def __len__(self):
+        return len(self._datos)
+
+
+class WorkerExcel:
+    def __init__(self, max_workers=4, max_pendientes=None, max_cache=16):
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="excel")
+        # Limita las peticiones en vuelo para no acumular trabajo sin control
+        self.pendientes = threading.BoundedSemaphore(max_pendientes or max_workers * 4)
+        self.cache = CacheLRU(max_cache)
+        # clave -> [lock, peticiones que lo usan]; se borra al quedar sin uso
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def _tomar_lock(self, clave):
+        with self._locks_lock:
+            entrada = self._locks.setdefault(clave, [threading.Lock(), 0])
+            entrada[1] += 1
+            return entrada[0]
+
+    def _soltar_lock(self, clave):
+        with self._locks_lock:
+            entrada = self._locks[clave]
+            entrada[1] -= 1
+            if not entrada[1]:
+                del self._locks[clave]
+
+    def generar(self, accion):
+        """Devuelve (bytes del .xlsx, si venía de cache)"""
+        # Las plantillas llevan la fecha del día, así que la cache se renueva cada día
+        dia = datetime.now().strftime("%Y-%m-%d")
+        clave = (accion, dia)
+        contenido = self.cache.get(clave)
+        if contenido is not None:
+            return contenido, True
+
+        # Peticiones simultáneas del mismo fichero esperan a una sola generación
+        lock = self._tomar_lock(clave)
+        try:
+            with lock:
+                contenido = self.cache.get(clave)
+                if contenido is not None:
+                    return contenido, True
+                buffer = io.BytesIO()
+                GENERADORES[accion](dia).save(buffer)
+                contenido = buffer.getvalue()
+                self.cache.put(clave, contenido)
+        finally:
+            self._soltar_lock(clave)
+        return contenido, False
+
+    def atender(self, peticion):
+        respuesta = {"id": peticion.get("id")}
+        accion = peticion.get("accion")
+        inicio = time.perf_counter()
+        try:
+            if accion == "ping":
+                respuesta.update(ok=True, pong=True)
+            elif accion == "estadisticas":
+                respuesta.update(ok=True, cache=len(self.cache))
+            elif accion in GENERADORES:
+                contenido, desde_cache = self.generar(accion)
+                respuesta.update(ok=True, cache=desde_cache)
+                if peticion.get("ruta"):
+                    with open(peticion["ruta"], "wb") as f:
+                        f.write(contenido)
+                    respuesta["ruta"] = peticion["ruta"]
+                else:
+                    respuesta["xlsx"] = base64.b64encode(contenido).decode("ascii")
+            else:
+                respuesta.update(ok=False, error=f"Acción desconocida: {accion}")
+        except Exception as e:
+            respuesta.update(ok=False, error=str(e))
+        respuesta["ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+        return respuesta
+
+    def enviar(self, linea, escribir):
+        """Decodifica una línea y la encola; `escribir` recibe la respuesta JSON"""
+        try:
+            peticion = json.loads(linea)
+        except ValueError as e:
+            escribir(json.dumps({"id": None, "ok": False, "error": f"JSON inválido: {e}"}, ensure_ascii=False))
+            return None
+        if not isinstance(peticion, dict):
+            escribir(json.dumps({"id": None, "ok": False, "error": "La petición debe ser un objeto JSON"}, ensure_ascii=False))
+            return None
+
+        def tarea():
+            try:
+                escribir(json.dumps(self.atender(peticion), ensure_ascii=False))
+            finally:
+                self.pendientes.release()
+
+        self.pendientes.acquire()
+        return self.pool.submit(tarea)
+
+    def cerrar(self):
+        self.pool.shutdown(wait=True)
+
+
+def servir_stdio(worker):
+    lock = threading.Lock()
+
+    def escribir(linea):
+        with lock:
+            sys.stdout.write(linea + "\n")
+            sys.stdout.flush()
+
+    for linea in sys.stdin:
+        if linea.strip():
+            worker.enviar(linea, escribir)
+    worker.cerrar()
+
+
+def servir_socket(worker, ruta):
+    class Manejador(socketserver.StreamRequestHandler):
+        def handle(self):
+            lock = threading.Lock()
+            # Solo se cuentan las peticiones sin responder: la conexión de server.ts
+            # dura tanto como el proceso y no debe acumular un futuro por petición
+            en_vuelo = [0]
+            terminadas = threading.Condition()
+
+            def escribir(linea):
+                with lock:
+                    self.wfile.write((linea + "\n").encode("utf-8"))
+                    self.wfile.flush()
+
+            def terminada(futuro):
+                with terminadas:
+                    en_vuelo[0] -= 1
+                    terminadas.notify_all()
+
+            for linea in self.rfile:
+                if linea.strip():
+                    futuro = worker.enviar(linea.decode("utf-8"), escribir)
+                    if futuro is not None:
+                        with terminadas:
+                            en_vuelo[0] += 1
+                        futuro.add_done_callback(terminada)
+            # No cerrar la conexión hasta haber respondido todo lo recibido
+            with terminadas:
+                terminadas.wait_for(lambda: not en_vuelo[0])
+
+    def terminar(signum, frame):
+        raise KeyboardInterrupt
+
+    # SIGTERM (p. ej. al parar server.ts) limpia el socket igual que Ctrl+C
+    signal.signal(signal.SIGTERM, terminar)
+
+    if os.path.exists(ruta):
+        os.unlink(ruta)
+    with socketserver.ThreadingUnixStreamServer(ruta, Manejador) as servidor:
+        print(f"🚀 Worker Excel escuchando en {ruta}", file=sys.stderr)
+        try:
+            servidor.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(ruta)
+            worker.cerrar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker persistente de generación de Excel")
+    parser.add_argument("--socket", help="Ruta del socket Unix (por defecto stdin/stdout)")
+    parser.add_argument("--workers", type=int, default=4, help="Tamaño del pool de generación")
+    parser.add_argument("--cache", type=int, default=16, help="Máximo de ficheros en cache")
+    args = parser.parse_args()
+
+    worker = WorkerExcel(max_workers=args.workers, max_cache=args.cache)
+    if args.socket:
+        servir_socket(worker, args.socket)
+    else:
+        servir_stdio(worker)
+
+if __name__ == "__main__":
+    main()